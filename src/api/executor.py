@@ -0,0 +1,70 @@
+"""Bounded executor for inference with backpressure."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Raised when no inference slot nor queue slot is free."""
+
+
+class BoundedExecutor:
+    """
+    Run blocking inference on a dedicated thread pool.
+    At most max_workers tasks run and queue_size wait; beyond that,
+    submissions are rejected immediately.
+    """
+
+    def __init__(self, max_workers, queue_size):
+        self.max_workers = max_workers
+        self.capacity = max_workers + queue_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="inference"
+        )
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _release(self, _future):
+        """Free the slot once the task is finished or cancelled."""
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, fn, *args, timeout=None):
+        """Run fn(*args) in the pool and await it within the deadline."""
+        with self._lock:
+            if self.pending >= self.capacity:
+                self.rejected += 1
+                raise QueueFullError()
+            self.pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except RuntimeError:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            # Cancelling a queued task frees its slot right away; a
+            # running task keeps its slot until it completes.
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise
+
+    def stats(self):
+        """Snapshot of the executor load."""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "capacity": self.capacity,
+                "pending": self.pending,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+    def shutdown(self):
+        """Stop the pool, cancelling queued tasks."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
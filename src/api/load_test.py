@@ -0,0 +1,115 @@
+"""
+Compare API throughput for different numbers of uvicorn workers.
+
+Usage:
+    python -m src.api.load_test --workers 1 4 --concurrency 16
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+SAMPLE_REVIEW = (
+    "Great sound quality, but the battery died after two weeks "
+    "and the customer service never answered my emails."
+)
+
+
+def post_review(url):
+    """Send one prediction request. Return (latency in ms, status)."""
+    payload = json.dumps({"content": SAMPLE_REVIEW}).encode("utf-8")
+    request = urllib.request.Request(
+        f"{url}/predict", data=payload,
+        headers={"Content-Type": "application/json"}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return (time.perf_counter() - start) * 1000, status
+
+
+def run_load(url, concurrency, duration):
+    """Send requests from `concurrency` clients for `duration` seconds."""
+    deadline = time.perf_counter() + duration
+
+    def client():
+        results = []
+        while time.perf_counter() < deadline:
+            results.append(post_review(url))
+        return results
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(client) for _ in range(concurrency)]
+        results = [r for f in futures for r in f.result()]
+    elapsed = time.perf_counter() - start
+    latencies = [ms for ms, status in results if status == 200]
+    return {
+        "requests": len(results),
+        "ok": len(latencies),
+        "rejected": len(results) - len(latencies),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if latencies else None,
+        "p95_ms": float(np.percentile(latencies, 95)) if latencies else None,
+    }
+
+
+def wait_until_healthy(url, timeout=300):
+    """Poll /health until the model is loaded."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=5):
+                return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(1)
+    raise TimeoutError(f"API at {url} did not become healthy")
+
+
+def benchmark_workers(n_workers, port, concurrency, duration):
+    """Start uvicorn with n_workers, load it, then stop it."""
+    url = f"http://127.0.0.1:{port}"
+    # WEB_CONCURRENCY also sizes the TensorFlow threads of each worker
+    env = dict(os.environ, WEB_CONCURRENCY=str(n_workers))
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "src.api.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(n_workers),
+    ], env=env)
+    try:
+        wait_until_healthy(url)
+        run_load(url, concurrency, duration=2)  # Warm-up
+        return run_load(url, concurrency, duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    """Run the comparison and print one line per worker count."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    for n_workers in args.workers:
+        result = benchmark_workers(
+            n_workers, args.port, args.concurrency, args.duration
+        )
+        print(f"workers={n_workers} {json.dumps(result)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,32 @@
 """API for inference tasks."""
 
+import os
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header
+from fastapi.responses import FileResponse, PlainTextResponse
 from pydantic import BaseModel
 from tensorflow import keras
 from src.model.model_pipeline import run_model_pipeline
-from src.data.clean_transform import clean_text
+from src.data.clean_transform import clean_text, fast_clean_text
+from src.model.cascade import CascadeStats, needs_escalation
 from src.api.model_loader import ModelLoader
+from src.api.executor import BoundedExecutor, QueueFullError
+from src.api import profiling
 
 
+# Inference concurrency, wait queue and per-request deadline (seconds)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "16"))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "5"))
+RETRY_AFTER = os.getenv("RETRY_AFTER", "1")
+
 # Define the loader class
 loader = None
+# Escalation counters of the cascade
+cascade_stats = CascadeStats()
+# Dedicated pool for inference, with backpressure
+executor = BoundedExecutor(INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE)
 
 
 @asynccontextmanager
@@ -21,6 +37,7 @@ async def lifespan(app: FastAPI):
     loader = ModelLoader().get_instance()
     yield  # The application runs while waiting here
     print("Shutting down...")
+    executor.shutdown()
 
 
 # Define the app (API)
@@ -48,7 +65,10 @@ def read_root():
                 "POST - Send text content to get sentiment prediction."
             ),
             "/metrics": "GET - View model performance metrics.",
-            "/train": "POST - Trigger the training pipeline (Background Task)."
+            "/train": (
+                "POST - Trigger the training pipeline (Background Task)."
+            ),
+            "/profiles": "GET - List recent request profiles."
         }
     }
 
@@ -61,15 +81,25 @@ def health_check():
     return {"status": "ok", "model_loaded": True}
 
 
-# Endpoint Predict
-@app.post("/predict")
-def predict(request: PredictionRequest):
-    if not loader.model:
-        raise HTTPException(
-            status_code=503, detail="Model service unavailable"
-        )
+def preprocess(text):
+    """Use the lemma table when available, the full NLTK path otherwise."""
+    if loader.lemma_table:
+        return fast_clean_text(text, loader.lemma_table)
+    return clean_text(text)
+
+
+def run_inference(content):
+    """Preprocess and score one text (blocking, runs in the executor)."""
     # Preprocessing
-    cleaned_text = clean_text(request.content)
+    cleaned_text = preprocess(content)
+    # Cascade: the linear model answers unless it is uncertain
+    if loader.linear_model is not None:
+        score = float(loader.linear_model.predict_proba([cleaned_text])[0][1])
+        escalated = needs_escalation(score)
+        cascade_stats.record(escalated)
+        if not escalated:
+            label = "POSITIVE" if score > 0.5 else "NEGATIVE"
+            return {"label": label, "confidence": score, "model": "linear"}
     sequences = loader.tokenizer.texts_to_sequences([cleaned_text])
     padded = keras.utils.pad_sequences(
         sequences, maxlen=128, padding="post", truncating="post"
@@ -82,9 +112,36 @@ def predict(request: PredictionRequest):
     return {
         "label": label,
         "confidence": score,
+        "model": "neural",
     }
 
 
+# Endpoint Predict
+@app.post("/predict")
+async def predict(request: PredictionRequest,
+                  x_profile: str | None = Header(default=None)):
+    if not loader.model:
+        raise HTTPException(
+            status_code=503, detail="Model service unavailable"
+        )
+    args = (run_inference, request.content)
+    # Profiling runs in the inference thread, around the whole path
+    if profiling.ENABLED and profiling.should_profile(x_profile):
+        args = (profiling.profiled, *args)
+    try:
+        return await executor.run(*args, timeout=INFERENCE_TIMEOUT)
+    except QueueFullError:
+        raise HTTPException(
+            status_code=429, detail="Too many requests, retry later",
+            headers={"Retry-After": RETRY_AFTER}
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503, detail="Inference deadline exceeded",
+            headers={"Retry-After": RETRY_AFTER}
+        )
+
+
 # Endpoint Metrics
 @app.get("/metrics")
 def get_metrics():
@@ -93,10 +150,33 @@ def get_metrics():
         raise HTTPException(status_code=404, detail="Metrics not found")
     return {
         "model_performance": loader.metrics,  # JSON file content
+        "cascade": cascade_stats.as_dict(),
+        "inference": executor.stats(),
         "system_info": {"status": "live", "api_version": "v1"}
     }
 
 
+# Endpoints Profiles
+@app.get("/profiles")
+def get_profiles():
+    """List recent request profiles."""
+    return {
+        "enabled": profiling.ENABLED,
+        "profiles": profiling.list_profiles(),
+    }
+
+
+@app.get("/profiles/{name}")
+def get_profile(name: str, format: str = "raw"):
+    """Download a profile (.prof) or view it as text (?format=text)."""
+    path = profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return PlainTextResponse(profiling.profile_summary(path))
+    return FileResponse(path, media_type="application/octet-stream")
+
+
 # Endpoint Train
 @app.post("/train")
 def trigger_training(background_tasks: BackgroundTasks):
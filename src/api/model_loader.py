@@ -1,18 +1,73 @@
 """Load model, tokenizer and metrics."""
 
 import os
+import fcntl
 import pickle
 import json
+import tempfile
+import numpy as np
 import tensorflow as tf
-from src.utils.s3_utils import download_file_from_s3
+from src.utils.s3_utils import download_file_from_s3, get_s3_etag
+from src.data.clean_transform import load_lemma_table
 
 
 # Configuration
 BUCKET_NAME = os.getenv("BUCKET_NAME")
+# Directory shared by all API workers for downloaded artifacts
+ARTIFACT_DIR = os.getenv(
+    "ARTIFACT_DIR", os.path.join(tempfile.gettempdir(), "artifacts")
+)
+# Number of API worker processes (also read by uvicorn --workers)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# TensorFlow threads per worker (default: cores split across workers)
+TF_THREADS = int(os.getenv(
+    "TF_THREADS", max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)
+))
 # S3 keys defined in the pipeline
 MODEL_S3_KEY = "models/sentiment_model.keras"
 TOKENIZER_S3_KEY = "models/tokenizer.pickle"
 METRICS_S3_KEY = "models/evaluation_results.json"
+LINEAR_S3_KEY = "models/linear_model.pickle"
+LEMMA_S3_KEY = "models/lemma_table.json"
+
+
+def configure_tensorflow_threads(n_threads=TF_THREADS):
+    """Limit TensorFlow threads so workers don't oversubscribe cores."""
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError as e:
+        # TensorFlow runtime already initialized
+        print(f"Could not set TensorFlow threads: {e}")
+
+
+def fetch_artifact(s3_key, artifact_dir=None):
+    """
+    Download an artifact once into the shared directory and return its
+    local path. Files are named after the S3 ETag, so a new version in
+    S3 is downloaded again. A file lock makes concurrent workers wait
+    for the first download instead of racing on the same file.
+    """
+    artifact_dir = artifact_dir or ARTIFACT_DIR
+    os.makedirs(artifact_dir, exist_ok=True)
+    name = os.path.basename(s3_key)
+    etag = get_s3_etag(BUCKET_NAME, s3_key).replace("-", "_")
+    versioned_name = f"{etag}-{name}"
+    local_path = os.path.join(artifact_dir, versioned_name)
+    with open(os.path.join(artifact_dir, f"{name}.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not os.path.exists(local_path):
+                tmp_path = f"{local_path}.{os.getpid()}.tmp"
+                download_file_from_s3(BUCKET_NAME, s3_key, tmp_path)
+                os.replace(tmp_path, local_path)
+                # Drop the versions replaced by this one
+                for old in os.listdir(artifact_dir):
+                    if old.endswith(f"-{name}") and old != versioned_name:
+                        os.remove(os.path.join(artifact_dir, old))
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return local_path
 
 
 class ModelLoader:
@@ -21,6 +76,8 @@ class ModelLoader:
     model = None
     tokenizer = None
     metrics = None
+    linear_model = None
+    lemma_table = None
 
     @classmethod
     def get_instance(cls):
@@ -33,21 +90,12 @@ class ModelLoader:
     def load_artifacts(self):
         """Download and upload model, tokenizer, and KPIs from S3."""
         print("Loading artifacts from S3...")
-        # Temporary local paths
-        local_model = "temp_model.keras"
-        local_tokenizer = "temp_tokenizer.pickle"
-        local_metrics = "temp_metrics.json"
+        configure_tensorflow_threads()
         try:
-            # 1. Download via your S3 utilities
-            download_file_from_s3(
-                BUCKET_NAME, MODEL_S3_KEY, local_model
-            )
-            download_file_from_s3(
-                BUCKET_NAME, TOKENIZER_S3_KEY, local_tokenizer
-            )
-            download_file_from_s3(
-                BUCKET_NAME, METRICS_S3_KEY, local_metrics
-            )
+            # 1. Download (once per instance, shared across workers)
+            local_model = fetch_artifact(MODEL_S3_KEY)
+            local_tokenizer = fetch_artifact(TOKENIZER_S3_KEY)
+            local_metrics = fetch_artifact(METRICS_S3_KEY)
             # 2. Loading into memory
             self.model = tf.keras.models.load_model(local_model)
             with open(local_tokenizer, "rb") as handle:
@@ -58,3 +106,35 @@ class ModelLoader:
         except Exception as e:
             print(f"Error loading model: {e}")
             self.model = None
+        self.load_linear_model()
+        self.load_lemma_table()
+        self.warm_up()
+
+    def load_linear_model(self):
+        """Load the cascade's linear model (optional)."""
+        try:
+            local_linear = fetch_artifact(LINEAR_S3_KEY)
+            with open(local_linear, "rb") as handle:
+                self.linear_model = pickle.load(handle)
+            print("Linear model loaded, cascade enabled.")
+        except Exception as e:
+            print(f"Linear model unavailable, cascade disabled: {e}")
+            self.linear_model = None
+
+    def load_lemma_table(self):
+        """Load the token -> lemma table (optional)."""
+        try:
+            local_lemmas = fetch_artifact(LEMMA_S3_KEY)
+            self.lemma_table = load_lemma_table(local_lemmas)
+            print("Lemma table loaded, fast preprocessing enabled.")
+        except Exception as e:
+            print(f"Lemma table unavailable, using full preprocessing: {e}")
+            self.lemma_table = None
+
+    def warm_up(self):
+        """Run one dummy prediction so the first request is not slow."""
+        if self.model is not None:
+            self.model.predict(np.zeros((1, 128), dtype="int32"), verbose=0)
+        if self.linear_model is not None:
+            self.linear_model.predict_proba(["warm up"])
+        print("Model warmed up.")
@@ -0,0 +1,157 @@
+"""
+On-demand profiling of the predict path.
+
+A sampled fraction of requests (PROFILE_SAMPLE_RATE), or requests sent
+with the X-Profile header when PROFILE_ALLOW_HEADER is set, run under
+cProfile. Profiles are written to PROFILE_DIR, keeping only the most
+recent PROFILE_MAX_FILES. Nothing is done when profiling is disabled.
+"""
+
+import os
+import io
+import time
+import uuid
+import random
+import shutil
+import pstats
+import cProfile
+import tempfile
+import threading
+from contextlib import contextmanager
+
+
+# Configuration
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_ALLOW_HEADER = (
+    os.getenv("PROFILE_ALLOW_HEADER", "false").lower() == "true"
+)
+PROFILE_TENSORFLOW = os.getenv("PROFILE_TENSORFLOW", "false").lower() == "true"
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR", os.path.join(tempfile.gettempdir(), "profiles")
+)
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+ENABLED = PROFILE_SAMPLE_RATE > 0 or PROFILE_ALLOW_HEADER
+
+# Only one cProfile (and TensorFlow trace) can be active at a time
+_profile_lock = threading.Lock()
+
+
+def should_profile(header_value=None):
+    """Decide whether the current request is profiled."""
+    if PROFILE_ALLOW_HEADER and header_value is not None:
+        if header_value.strip().lower() in ("1", "true"):
+            return True
+    return random.random() < PROFILE_SAMPLE_RATE
+
+
+def rotate(profile_dir=None, max_files=PROFILE_MAX_FILES):
+    """
+    Delete the oldest profiles beyond max_files. Files already removed
+    by another worker sharing the directory are skipped.
+    """
+    profile_dir = profile_dir or PROFILE_DIR
+    profiles = list_profiles(profile_dir)
+    for profile in profiles[max_files:]:
+        try:
+            os.remove(os.path.join(profile_dir, profile["name"]))
+        except OSError:
+            pass
+        trace_dir = os.path.join(profile_dir, profile["tensorflow_trace"])
+        shutil.rmtree(trace_dir, ignore_errors=True)
+
+
+def profiled(fn, *args, profile_dir=None):
+    """
+    Run fn(*args) under cProfile and save the profile. If another
+    request is already being profiled, run fn unprofiled. Failing to
+    save the profile never fails the request.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return fn(*args)
+    try:
+        profile_dir = profile_dir or PROFILE_DIR
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        profiler = cProfile.Profile()
+        with _tensorflow_trace(os.path.join(profile_dir, f"{stem}.tf")):
+            try:
+                return profiler.runcall(fn, *args)
+            finally:
+                _save_profile(profiler, profile_dir, stem)
+    finally:
+        _profile_lock.release()
+
+
+def _save_profile(profiler, profile_dir, stem):
+    """Write the profile and rotate old ones, logging any error."""
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(profile_dir, f"{stem}.prof"))
+        rotate(profile_dir)
+    except Exception as e:
+        print(f"Profile not saved: {e}")
+
+
+@contextmanager
+def _tensorflow_trace(logdir):
+    """Record a TensorFlow profiler trace if enabled (under the lock)."""
+    if not PROFILE_TENSORFLOW:
+        yield
+        return
+    import tensorflow as tf
+    try:
+        tf.profiler.experimental.start(logdir)
+    except Exception as e:
+        print(f"TensorFlow trace not started: {e}")
+        yield
+        return
+    try:
+        yield
+    finally:
+        try:
+            tf.profiler.experimental.stop()
+        except Exception as e:
+            print(f"TensorFlow trace not stopped: {e}")
+
+
+def list_profiles(profile_dir=None):
+    """Saved profiles, most recent first."""
+    profile_dir = profile_dir or PROFILE_DIR
+    try:
+        names = os.listdir(profile_dir)
+    except OSError:
+        return []
+    profiles = []
+    for name in names:
+        if not name.endswith(".prof"):
+            continue
+        path = os.path.join(profile_dir, name)
+        try:
+            size_bytes = os.path.getsize(path)
+            created = os.path.getmtime(path)
+        except OSError:  # Rotated away by another worker
+            continue
+        profiles.append({
+            "name": name,
+            "size_bytes": size_bytes,
+            "created": created,
+            "tensorflow_trace": name[:-len(".prof")] + ".tf",
+        })
+    profiles.sort(key=lambda p: p["created"], reverse=True)
+    return profiles
+
+
+def profile_path(name, profile_dir=None):
+    """Path of a saved profile, or None if it does not exist."""
+    profile_dir = profile_dir or PROFILE_DIR
+    if name != os.path.basename(name) or not name.endswith(".prof"):
+        return None
+    path = os.path.join(profile_dir, name)
+    return path if os.path.isfile(path) else None
+
+
+def profile_summary(path, top=30):
+    """Text summary of a profile, sorted by cumulative time."""
+    stream = io.StringIO()
+    stats = pstats.Stats(path, stream=stream)
+    stats.sort_stats("cumulative").print_stats(top)
+    return stream.getvalue()
@@ -3,6 +3,8 @@ Download raw data from S3 and clean it locally.
 """
 
 import re
+import json
+from collections import Counter, defaultdict
 import pandas as pd
 import nltk
 from nltk.corpus import stopwords, wordnet
@@ -40,16 +42,23 @@ def get_wordnet_pos(tag):
     return wordnet.NOUN  # default fallback
 
 
-def lemmatize(tokens):
+def lemmatize(tokens, lemma_counts=None):
     """Lemmatization with POS tagging"""
+    if not tokens:
+        return []
     pos_tags = nltk.pos_tag(tokens)
-    return [
+    lemmas = [
         lemmatizer.lemmatize(word, get_wordnet_pos(tag))
         for word, tag in pos_tags
     ]
+    # Record token -> lemma occurrences to build the lookup table
+    if lemma_counts is not None:
+        for word, lemma in zip(tokens, lemmas):
+            lemma_counts[word][lemma] += 1
+    return lemmas
 
 
-def clean_text(text):
+def clean_text(text, lemma_counts=None):
     """Full preprocessing pipeline for a given text"""
     # 1. Lowercase
     text = text.lower()
@@ -58,14 +67,81 @@ def clean_text(text):
     # 3. Tokenize
     tokens = word_tokenize(text)
     # 4. Lemmatize
-    tokens = lemmatize(tokens)
+    tokens = lemmatize(tokens, lemma_counts)
     # 5. Remove stopwords (except "not")
     tokens = [word for word in tokens if word not in stop_words]
     return " ".join(tokens)
 
 
-def process_data(bucket_name, s3_key, local_path_input, local_path_output):
-    """Get raw data from S3 and clean it."""
+def build_lemma_table(lemma_counts):
+    """Keep the most frequent lemma of each token."""
+    return {
+        word: counts.most_common(1)[0][0]
+        for word, counts in lemma_counts.items()
+    }
+
+
+def fast_clean_text(text, lemma_table):
+    """
+    Serving-side preprocessing: regex + lemma table lookup.
+    Unknown tokens fall back to the POS-aware lemmatizer.
+    """
+    words = re.sub(r"[^\w\s]", " ", text.lower()).split()
+    # Unknown words are POS tagged together, in a single pass
+    unknown = [
+        word_tokenize(word) for word in words if word not in lemma_table
+    ]
+    fallback = iter(lemmatize([t for parts in unknown for t in parts]))
+    unknown_parts = iter(unknown)
+    tokens = []
+    for word in words:
+        if word in lemma_table:
+            tokens.append(lemma_table[word])
+        else:
+            tokens.extend(next(fallback) for _ in next(unknown_parts))
+    tokens = [word for word in tokens if word not in stop_words]
+    return " ".join(tokens)
+
+
+def measure_divergence(texts, lemma_table):
+    """Share of texts where fast_clean_text differs from clean_text."""
+    texts = list(texts)
+    diverged = sum(
+        fast_clean_text(text, lemma_table) != clean_text(text)
+        for text in texts
+    )
+    return {
+        "texts": len(texts),
+        "diverged": diverged,
+        "divergence_rate": diverged / len(texts) if texts else 0.0,
+    }
+
+
+def save_lemma_table(lemma_table, local_path):
+    """Save the lemma table as JSON."""
+    with open(local_path, "w", encoding="utf-8") as f:
+        json.dump(lemma_table, f)
+
+
+def load_lemma_table(local_path):
+    """Load a lemma table saved with save_lemma_table."""
+    with open(local_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_lemma_stats(stats, local_path):
+    """Save the lemma table statistics as JSON."""
+    with open(local_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=4)
+
+
+def process_data(bucket_name, s3_key, local_path_input, local_path_output,
+                 local_path_lemmas=None, local_path_lemma_stats=None):
+    """
+    Get raw data from S3 and clean it. Optionally build the lemma table,
+    leaving out a sample of reviews on which the divergence of the fast
+    path is measured, as for unseen text at serving time.
+    """
     # 1. Download from S3
     print(f"Downloading raw data from S3 bucket {bucket_name}...")
     download_file_from_s3(bucket_name, s3_key, local_path_input)
@@ -74,8 +150,26 @@ def process_data(bucket_name, s3_key, local_path_input, local_path_output):
     df = pd.read_parquet(local_path_input)
     df["content"] = df["title"] + " " + df["content"]
     df.drop("title", axis=1, inplace=True)
-    df["content"] = df["content"].apply(clean_text)
+    raw_content = df["content"]
+    held_out = raw_content.sample(
+        n=min(1000, len(raw_content) // 10), random_state=42
+    ).index
+    counted = ~raw_content.index.isin(held_out)
+    lemma_counts = defaultdict(Counter)
+    df["content"] = [
+        clean_text(text, lemma_counts if count else None)
+        for text, count in zip(raw_content, counted)
+    ]
     # 3. Save locally as Parquet
     df.to_parquet(local_path_output, index=False)
     print(f"Cleaned data saved locally: {local_path_output}")
     print(f"Preview:\n{df.head()}")
+    # 4. Save the token -> lemma table used at serving time
+    if local_path_lemmas:
+        lemma_table = build_lemma_table(lemma_counts)
+        save_lemma_table(lemma_table, local_path_lemmas)
+        stats = {"tokens": len(lemma_table)}
+        stats.update(measure_divergence(raw_content[held_out], lemma_table))
+        print(f"Lemma table (divergence on held-out reviews): {stats}")
+        if local_path_lemma_stats:
+            save_lemma_stats(stats, local_path_lemma_stats)
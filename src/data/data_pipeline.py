@@ -3,6 +3,7 @@
 import os
 import sys
 from botocore.exceptions import BotoCoreError, ClientError
+from src.utils.stages import StageRunner
 from . import download_data
 from . import clean_transform
 from . import load_final
@@ -13,15 +14,25 @@ RAW_S3_KEY = "data/raw/amazon_polarity.parquet"
 RAW_LOCAL_FILE = "temp_raw.parquet"
 CLEAN_LOCAL_FILE = "temp_clean.parquet"
 PROCESSED_S3_KEY = "data/processed/amazon_polarity_cleaned.parquet"
+# Token -> lemma table, shipped with the model artifacts
+LEMMA_LOCAL_FILE = "temp_lemma_table.json"
+LEMMA_S3_KEY = "models/lemma_table.json"
+# Table size and fast-path divergence on held-out reviews
+LEMMA_STATS_LOCAL_FILE = "temp_lemma_stats.json"
+LEMMA_STATS_S3_KEY = "models/lemma_table_stats.json"
 
 
 def run_data_pipeline():
     """Run the full data pipeline."""
     print("Starting Automated Data Pipeline")
+    # Unchanged stages are skipped
+    stages = StageRunner("data")
     # Step 1: Ingest
     print("Step 1: Data Ingestion")
     try:
-        download_data.download_and_upload_raw(
+        stages.run(
+            "ingest", download_data.download_and_upload_raw,
+            outputs=[RAW_LOCAL_FILE],
             bucket_name=BUCKET_NAME,
             s3_key=RAW_S3_KEY,
             local_path=RAW_LOCAL_FILE
@@ -33,11 +44,18 @@ def run_data_pipeline():
     # Step 2: Transform
     print("Step 2: Data Transformation")
     try:
-        clean_transform.process_data(
+        stages.run(
+            "transform", clean_transform.process_data,
+            inputs=[RAW_LOCAL_FILE],
+            outputs=[
+                CLEAN_LOCAL_FILE, LEMMA_LOCAL_FILE, LEMMA_STATS_LOCAL_FILE
+            ],
             bucket_name=BUCKET_NAME,
             s3_key=RAW_S3_KEY,
             local_path_input=RAW_LOCAL_FILE,
-            local_path_output=CLEAN_LOCAL_FILE
+            local_path_output=CLEAN_LOCAL_FILE,
+            local_path_lemmas=LEMMA_LOCAL_FILE,
+            local_path_lemma_stats=LEMMA_STATS_LOCAL_FILE
         )
     except (BotoCoreError, ClientError) as e:
         print(f"Pipeline failed at Step 2 (Transform): {e}")
@@ -46,15 +64,32 @@ def run_data_pipeline():
     # Step 3: Load
     print("Step 3: Data Loading")
     try:
-        load_final.load_to_s3_final(
+        stages.run(
+            "load_data", load_final.load_to_s3_final,
+            inputs=[CLEAN_LOCAL_FILE],
             bucket_name=BUCKET_NAME,
             local_path=CLEAN_LOCAL_FILE,
             s3_key=PROCESSED_S3_KEY
         )
+        stages.run(
+            "load_lemmas", load_final.load_to_s3_final,
+            inputs=[LEMMA_LOCAL_FILE],
+            bucket_name=BUCKET_NAME,
+            local_path=LEMMA_LOCAL_FILE,
+            s3_key=LEMMA_S3_KEY
+        )
+        stages.run(
+            "load_lemma_stats", load_final.load_to_s3_final,
+            inputs=[LEMMA_STATS_LOCAL_FILE],
+            bucket_name=BUCKET_NAME,
+            local_path=LEMMA_STATS_LOCAL_FILE,
+            s3_key=LEMMA_STATS_S3_KEY
+        )
     except (FileNotFoundError, BotoCoreError, ClientError) as e:
         print(f"Pipeline failed at Step 3 (Load): {e}")
         sys.exit(1)
     print("\nPipeline completed successfully.")
+    stages.summary()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+"""
+Offline bulk scoring of a parquet dataset.
+
+Usage:
+    python -m src.model.batch_score INPUT OUTPUT [--chunk-size N]
+
+INPUT and OUTPUT are local paths or s3://bucket/key URIs, streamed
+through pyarrow filesystems. Rows go through the same cascade as the
+API: the linear model answers unless it is uncertain.
+"""
+
+import os
+import time
+import argparse
+import resource
+from multiprocessing import Pool
+import numpy as np
+import pyarrow as pa
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from tensorflow import keras
+from src.api.model_loader import ModelLoader
+from src.data.clean_transform import clean_text, fast_clean_text
+from src.model.cascade import needs_escalation
+
+
+# Configuration
+CHUNK_SIZE = int(os.getenv("SCORING_CHUNK_SIZE", "10000"))
+PREDICT_BATCH_SIZE = int(os.getenv("SCORING_BATCH_SIZE", "512"))
+CLEANING_WORKERS = int(os.getenv("CLEANING_WORKERS", os.cpu_count() or 1))
+
+# Lemma table of each cleaning worker process
+_lemma_table = None
+
+
+def _init_cleaner(lemma_table):
+    """Pool initializer: share the lemma table with the worker."""
+    global _lemma_table
+    _lemma_table = lemma_table
+
+
+def _clean(text):
+    """Same preprocessing as the API."""
+    if _lemma_table:
+        return fast_clean_text(text, _lemma_table)
+    return clean_text(text)
+
+
+def split_s3_uri(uri):
+    """Return (bucket, key) for an s3:// URI, None otherwise."""
+    if not uri.startswith("s3://"):
+        return None
+    bucket, _, key = uri[len("s3://"):].partition("/")
+    return bucket, key
+
+
+def resolve_uri(uri):
+    """Return (filesystem, path) for a local path or an s3:// URI."""
+    if split_s3_uri(uri):
+        return pafs.FileSystem.from_uri(uri)
+    return pafs.LocalFileSystem(), os.path.abspath(uri)
+
+
+def output_schema(input_schema):
+    """Input columns plus the prediction columns, fixed for all chunks."""
+    # A chunk whose column is entirely null must not infer its own type
+    schema = input_schema.remove_metadata()
+    schema = schema.append(pa.field("predicted_label", pa.string()))
+    schema = schema.append(pa.field("confidence", pa.float32()))
+    return schema.append(pa.field("model", pa.string()))
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process and of the cleaning workers."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux
+    return own / 1024, children / 1024
+
+
+def score_texts(model, tokenizer, cleaned):
+    """Batched inference on cleaned texts. Return (labels, confidences)."""
+    sequences = tokenizer.texts_to_sequences(cleaned)
+    padded = keras.utils.pad_sequences(
+        sequences, maxlen=128, padding="post", truncating="post"
+    )
+    scores = model.predict(
+        padded, batch_size=PREDICT_BATCH_SIZE, verbose=0
+    )[:, 0]
+    labels = np.where(scores > 0.5, "POSITIVE", "NEGATIVE")
+    return labels, scores.astype("float32")
+
+
+def score_chunk(loader, cleaned):
+    """
+    Cascade on a chunk of cleaned texts, as /predict does. Only the
+    rows the linear model is unsure about reach the neural model.
+    Return (labels, confidences, models).
+    """
+    if loader.linear_model is None:
+        labels, scores = score_texts(loader.model, loader.tokenizer, cleaned)
+        return labels, scores, np.full(len(cleaned), "neural")
+    scores = loader.linear_model.predict_proba(cleaned)[:, 1]
+    scores = scores.astype("float32")
+    labels = np.where(scores > 0.5, "POSITIVE", "NEGATIVE")
+    models = np.full(len(cleaned), "linear")
+    escalated = np.flatnonzero(needs_escalation(scores))
+    if len(escalated):
+        labels[escalated], scores[escalated] = score_texts(
+            loader.model, loader.tokenizer,
+            [cleaned[i] for i in escalated]
+        )
+        models[escalated] = "neural"
+    return labels, scores, models
+
+
+def _score_chunks(parquet_file, writer, pool, loader, chunk_size, start):
+    """Score parquet_file chunk by chunk. Return (rows, neural rows)."""
+    columns = parquet_file.schema_arrow.names
+    rows = neural = 0
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        df = batch.to_pandas()
+        texts = df["content"].fillna("")
+        # Raw data: title and content are combined as in the pipeline
+        if "title" in columns:
+            texts = df["title"].fillna("") + " " + texts
+        cleaned = pool.map(_clean, texts, chunksize=256)
+        labels, scores, models = score_chunk(loader, cleaned)
+        df["predicted_label"] = labels
+        df["confidence"] = scores
+        df["model"] = models
+        writer.write_table(
+            pa.Table.from_pandas(df, schema=writer.schema,
+                                 preserve_index=False)
+        )
+        rows += len(df)
+        neural += int((models == "neural").sum())
+        rate = rows / (time.perf_counter() - start)
+        print(f"Scored {rows} rows ({rate:.0f} rows/sec)")
+    return rows, neural
+
+
+def score_file(input_uri, output_uri, chunk_size=CHUNK_SIZE,
+               workers=CLEANING_WORKERS):
+    """Stream input_uri in chunks and write the scored parquet."""
+    loader = ModelLoader()
+    loader.load_lemma_table()
+    in_fs, in_path = resolve_uri(input_uri)
+    out_fs, out_path = resolve_uri(output_uri)
+    start = time.perf_counter()
+    # Fork the cleaning workers before TensorFlow loads the model
+    with (
+        Pool(workers, _init_cleaner, (loader.lemma_table,)) as pool,
+        in_fs.open_input_file(in_path) as source,
+    ):
+        parquet_file = pq.ParquetFile(source)
+        schema = output_schema(parquet_file.schema_arrow)
+        with pq.ParquetWriter(out_path, schema, filesystem=out_fs) as writer:
+            loader.load_artifacts()
+            if loader.model is None:
+                raise RuntimeError("Model could not be loaded.")
+            rows, neural = _score_chunks(
+                parquet_file, writer, pool, loader, chunk_size, start
+            )
+    elapsed = time.perf_counter() - start
+    own_mb, workers_mb = peak_memory_mb()
+    report = {
+        "rows": rows,
+        "neural_rows": neural,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed else 0.0,
+        "peak_memory_mb": own_mb,
+        "peak_worker_memory_mb": workers_mb,
+    }
+    print(f"Scoring report: {report}")
+    return report
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Bulk sentiment scoring.")
+    parser.add_argument("input", help="Parquet file path or s3:// URI")
+    parser.add_argument("output", help="Parquet file path or s3:// URI")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=CLEANING_WORKERS)
+    args = parser.parse_args()
+    score_file(args.input, args.output, args.chunk_size, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Cascade inference: a cheap linear model first, the neural model only
+when the linear model is uncertain.
+"""
+
+import os
+import threading
+
+
+# Linear scores inside [CASCADE_LOWER, CASCADE_UPPER] are escalated
+CASCADE_LOWER = float(os.getenv("CASCADE_LOWER", "0.2"))
+CASCADE_UPPER = float(os.getenv("CASCADE_UPPER", "0.8"))
+
+
+def needs_escalation(score, lower=CASCADE_LOWER, upper=CASCADE_UPPER):
+    """
+    Return True if the linear score is too uncertain to be trusted.
+    Also works element-wise on a numpy array of scores.
+    """
+    return (lower <= score) & (score <= upper)
+
+
+class CascadeStats:
+    """Thread-safe counters of linear vs escalated predictions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.escalated = 0
+
+    def record(self, escalated):
+        """Count one prediction."""
+        with self._lock:
+            self.total += 1
+            self.escalated += int(escalated)
+
+    def as_dict(self):
+        """Snapshot of the counters and escalation rate."""
+        with self._lock:
+            rate = self.escalated / self.total if self.total else 0.0
+            return {
+                "band": [CASCADE_LOWER, CASCADE_UPPER],
+                "requests": self.total,
+                "escalated": self.escalated,
+                "escalation_rate": rate,
+            }
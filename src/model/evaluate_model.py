@@ -1,20 +1,15 @@
 """
-Evaluate the LSTM model.
+Evaluate the trained model.
 """
 
+import os
 import json
-from tensorflow import keras
-from sklearn.metrics import classification_report
-from src.utils.s3_utils import upload_file_to_s3
-
-
-def prepare_test_data(x_test, y_test, tokenizer):
-    """Prepare test data for evaluation."""
-    x_test_seq = tokenizer.texts_to_sequences(x_test)
-    x_test_pad = keras.utils.pad_sequences(
-        x_test_seq, padding="post", maxlen=128
-    )
-    return x_test_pad, y_test
+import time
+import tempfile
+import numpy as np
+import tensorflow as tf
+from sklearn.metrics import accuracy_score, classification_report
+from src.model.cascade import needs_escalation
 
 
 def evaluate(model, x_test_pad, y_test):
@@ -26,8 +21,116 @@ def evaluate(model, x_test_pad, y_test):
     return results, report_dict
 
 
-def save_and_upload_metrics(results, report_dict, bucket_name, metrics_s3_key):
-    """Upload evaluation metrics into S3."""
+def model_size_mb(model):
+    """Size of the saved .keras file in megabytes."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.keras")
+        model.save(path)
+        return os.path.getsize(path) / (1024 * 1024)
+
+
+def measure_latency(model, x_test_pad, n_runs=100, batch_size=256):
+    """Measure CPU latency for single requests and batched scoring."""
+    with tf.device("/CPU:0"):
+        single = x_test_pad[:1]
+        model(single, training=False)  # Warm-up (graph tracing)
+        timings = []
+        for i in range(n_runs):
+            sample = x_test_pad[i % len(x_test_pad)][None, :]
+            start = time.perf_counter()
+            model(sample, training=False)
+            timings.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        model.predict(x_test_pad, batch_size=batch_size, verbose=0)
+        batch_seconds = time.perf_counter() - start
+    return {
+        "single_p50_ms": float(np.percentile(timings, 50)),
+        "single_p95_ms": float(np.percentile(timings, 95)),
+        "batch_rows_per_sec": float(len(x_test_pad) / batch_seconds),
+    }
+
+
+def profile_model(model, x_test_pad, y_test):
+    """Accuracy, size and CPU latency of a model."""
+    y_pred = (model.predict(x_test_pad, verbose=0) > 0.5).astype(int)
+    profile = {
+        "accuracy": float(accuracy_score(y_test, y_pred)),
+        "parameters": int(model.count_params()),
+        "size_mb": model_size_mb(model),
+    }
+    profile.update(measure_latency(model, x_test_pad))
+    return profile
+
+
+def compare_models(models, x_test_pad, y_test, profiles=None):
+    """
+    Profile several models and print them side by side. Models already
+    in profiles (by name) are not profiled again.
+    """
+    profiles = profiles or {}
+    comparison = {
+        name: profiles.get(name) or profile_model(model, x_test_pad, y_test)
+        for name, model in models.items()
+    }
+    header = (
+        f"{'model':<18}{'accuracy':>10}{'params':>10}{'size_mb':>10}"
+        f"{'p50_ms':>10}{'p95_ms':>10}{'rows/s':>10}"
+    )
+    print(header)
+    for name, p in comparison.items():
+        print(
+            f"{name:<18}{p['accuracy']:>10.4f}{p['parameters']:>10}"
+            f"{p['size_mb']:>10.2f}{p['single_p50_ms']:>10.2f}"
+            f"{p['single_p95_ms']:>10.2f}{p['batch_rows_per_sec']:>10.0f}"
+        )
+    return comparison
+
+
+def linear_latency_ms(linear_model, x_test, n_runs=100):
+    """Median single-request latency of the linear model."""
+    texts = list(x_test[:n_runs])
+    linear_model.predict_proba(texts[:1])  # Warm-up
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        linear_model.predict_proba([text])
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50))
+
+
+def evaluate_cascade(linear_model, model, x_test, x_test_pad, y_test):
+    """Compare the linear -> neural cascade with the neural model alone."""
+    y_true = np.asarray(y_test)
+    linear_scores = linear_model.predict_proba(list(x_test))[:, 1]
+    neural_scores = model.predict(x_test_pad, verbose=0)[:, 0]
+    escalated = needs_escalation(linear_scores)
+    cascade_scores = np.where(escalated, neural_scores, linear_scores)
+    # Average cost per request, in milliseconds of single-request latency
+    linear_ms = linear_latency_ms(linear_model, x_test)
+    neural_ms = measure_latency(model, x_test_pad)["single_p50_ms"]
+    escalation_rate = float(escalated.mean())
+    cascade_ms = linear_ms + escalation_rate * neural_ms
+    return {
+        "linear_accuracy": float(
+            accuracy_score(y_true, linear_scores > 0.5)
+        ),
+        "neural_accuracy": float(
+            accuracy_score(y_true, neural_scores > 0.5)
+        ),
+        "cascade_accuracy": float(
+            accuracy_score(y_true, cascade_scores > 0.5)
+        ),
+        "escalation_rate": escalation_rate,
+        "linear_cost_ms": linear_ms,
+        "neural_cost_ms": neural_ms,
+        "cascade_cost_ms": cascade_ms,
+        "relative_cost": cascade_ms / neural_ms,
+    }
+
+
+def save_metrics(results, report_dict, comparison=None, cascade=None,
+                 profile=None, local_metrics_file="metrics.json"):
+    """Save evaluation metrics locally as JSON."""
     metrics_data = {
         "global_score": {
             "loss": float(results[0]),
@@ -37,7 +140,11 @@ def save_and_upload_metrics(results, report_dict, bucket_name, metrics_s3_key):
         },
         "classification_report": report_dict,
     }
-    local_metrics_file = "metrics.json"
+    if profile:
+        metrics_data["model_profile"] = profile
+    if comparison:
+        metrics_data["architecture_comparison"] = comparison
+    if cascade:
+        metrics_data["cascade"] = cascade
     with open(local_metrics_file, "w", encoding="utf-8") as f:
         json.dump(metrics_data, f, indent=4)
-    upload_file_to_s3(local_metrics_file, bucket_name, metrics_s3_key)
@@ -0,0 +1,102 @@
+"""
+Memory-mapped cache of tokenized training and test features.
+
+Entries are keyed by a hash of the input data, the split settings and
+the tokenizer parameters, so a cache hit skips tokenization and padding.
+The raw texts of the split are stored alongside, so stages that need
+them do not re-read and re-split the dataset. Only the latest entry is
+kept.
+"""
+
+import os
+import json
+import shutil
+import pickle
+import hashlib
+import numpy as np
+import pandas as pd
+from src.utils.stages import file_hash
+
+
+# Configuration
+FEATURE_CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", "feature_cache")
+ARRAY_NAMES = ("x_train", "x_test", "y_train", "y_test")
+TEXT_NAMES = ("x_train", "x_test")
+
+
+def cache_key(data_path, params):
+    """Cache key from the data content and the preprocessing parameters."""
+    payload = json.dumps(
+        {"data": file_hash(data_path), "params": params}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _entry_files(entry):
+    """Paths of every file a complete cache entry contains."""
+    files = [os.path.join(entry, f"{name}.npy") for name in ARRAY_NAMES]
+    files += [
+        os.path.join(entry, f"{name}_text.parquet") for name in TEXT_NAMES
+    ]
+    return files + [os.path.join(entry, "tokenizer.pickle")]
+
+
+def load_features(key, cache_dir=FEATURE_CACHE_DIR):
+    """Return memory-mapped arrays and the tokenizer, or None on a miss."""
+    entry = os.path.join(cache_dir, key)
+    tokenizer_path = os.path.join(entry, "tokenizer.pickle")
+    if not all(os.path.exists(path) for path in _entry_files(entry)):
+        return None
+    features = {
+        name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r")
+        for name in ARRAY_NAMES
+    }
+    with open(tokenizer_path, "rb") as handle:
+        tokenizer = pickle.load(handle)
+    print(f"Feature cache hit: {entry}")
+    return features, tokenizer
+
+
+def load_texts(key, cache_dir=FEATURE_CACHE_DIR):
+    """Return the raw train/test texts of a cached split, or None."""
+    entry = os.path.join(cache_dir, key)
+    if not all(os.path.exists(path) for path in _entry_files(entry)):
+        return None
+    return tuple(
+        pd.read_parquet(
+            os.path.join(entry, f"{name}_text.parquet")
+        )["content"]
+        for name in TEXT_NAMES
+    )
+
+
+def prune(key, cache_dir=FEATURE_CACHE_DIR):
+    """Remove every cache entry except the current key."""
+    for name in os.listdir(cache_dir):
+        if name != key:
+            shutil.rmtree(os.path.join(cache_dir, name))
+
+
+def save_features(key, features, tokenizer, texts,
+                  cache_dir=FEATURE_CACHE_DIR):
+    """
+    Store features, the split's raw texts (a dict keyed like TEXT_NAMES)
+    and the tokenizer, then reload the features memory-mapped.
+    """
+    entry = os.path.join(cache_dir, key)
+    tmp_entry = f"{entry}.tmp-{os.getpid()}"
+    os.makedirs(tmp_entry, exist_ok=True)
+    for name in ARRAY_NAMES:
+        np.save(os.path.join(tmp_entry, f"{name}.npy"), features[name])
+    for name in TEXT_NAMES:
+        pd.DataFrame({"content": list(texts[name])}).to_parquet(
+            os.path.join(tmp_entry, f"{name}_text.parquet"), index=False
+        )
+    with open(os.path.join(tmp_entry, "tokenizer.pickle"), "wb") as handle:
+        pickle.dump(tokenizer, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    if os.path.exists(entry):
+        shutil.rmtree(entry)
+    os.replace(tmp_entry, entry)
+    print(f"Feature cache stored: {entry}")
+    prune(key, cache_dir)
+    return load_features(key, cache_dir)
@@ -2,23 +2,43 @@
 
 import os
 import pickle
+import shutil
 import pandas as pd
 from sklearn.model_selection import train_test_split
 import tensorflow as tf
-from src.utils.s3_utils import download_file_from_s3
+from src.utils.s3_utils import download_file_from_s3, upload_file_to_s3
+from src.utils.stages import StageRunner, source_hash
 from . import train_model
 from . import evaluate_model
+from . import feature_cache
+from . import cascade
 
 
 # Configuration
 BUCKET_NAME = os.getenv("BUCKET_NAME")
 DATA_KEY = "data/processed/amazon_polarity_cleaned.parquet"
 LOCAL_DATA_FILE = "amazon_polarity_cleaned.parquet"
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
 
 # Artifact paths in S3 (to add or to retrieve)
 MODEL_S3_KEY = "models/sentiment_model.keras"
 TOKENIZER_S3_KEY = "models/tokenizer.pickle"
 METRICS_S3_KEY = "models/evaluation_results.json"
+LINEAR_S3_KEY = "models/linear_model.pickle"
+
+# Local artifacts written by the pipeline stages
+LOCAL_MODEL_FILE = "model_temp.keras"
+LOCAL_TOKENIZER_FILE = "tokenizer_temp.pickle"
+LOCAL_LINEAR_FILE = "linear_temp.pickle"
+LOCAL_METRICS_FILE = "metrics.json"
+
+# Comma-separated architectures to benchmark against the trained model
+COMPARE_ARCHITECTURES = [
+    name.strip()
+    for name in os.getenv("COMPARE_ARCHITECTURES", "").split(",")
+    if name.strip()
+]
 
 
 def load_artifacts():
@@ -35,40 +55,263 @@ def load_artifacts():
     return model, tokenizer
 
 
-def load_and_split_data():
-    """Download data and split it. Return training data."""
+def ensure_local_data():
+    """Download the cleaned dataset if it is not available locally."""
     if not os.path.exists(LOCAL_DATA_FILE):
         download_file_from_s3(BUCKET_NAME, DATA_KEY, LOCAL_DATA_FILE)
+
+
+def load_and_split_data():
+    """Download data and split it. Return training data."""
+    ensure_local_data()
     df = pd.read_parquet(LOCAL_DATA_FILE)
     x = df["content"]
     y = df["label"]
-    return train_test_split(x, y, test_size=0.2, stratify=y, random_state=42)
+    return train_test_split(
+        x, y, test_size=TEST_SIZE, stratify=y, random_state=RANDOM_STATE
+    )
+
+
+def feature_key():
+    """
+    Feature cache key for the local dataset and current settings. The
+    source of the split, tokenizer and padding functions is part of it,
+    so changing how features are built invalidates the cache.
+    """
+    ensure_local_data()
+    return feature_cache.cache_key(LOCAL_DATA_FILE, {
+        "test_size": TEST_SIZE,
+        "random_state": RANDOM_STATE,
+        "max_vocab": train_model.MAX_VOCAB,
+        "max_len": train_model.MAX_LEN,
+        "code": [
+            source_hash(fn) for fn in (
+                load_and_split_data,
+                train_model.fit_tokenizer,
+                train_model.pad_texts,
+            )
+        ],
+    })
+
+
+def load_features():
+    """
+    Return padded train/test arrays and the tokenizer. Served from the
+    memory-mapped feature cache when data and parameters are unchanged.
+    """
+    key = feature_key()
+    cached = feature_cache.load_features(key)
+    if cached is not None:
+        return cached
+    x_train, x_test, y_train, y_test = load_and_split_data()
+    tokenizer = train_model.fit_tokenizer(x_train)  # Fit only on train
+    features = {
+        "x_train": train_model.pad_texts(tokenizer, x_train),
+        "x_test": train_model.pad_texts(tokenizer, x_test),
+        "y_train": y_train.to_numpy(dtype="int32"),
+        "y_test": y_test.to_numpy(dtype="int32"),
+    }
+    texts = {"x_train": x_train, "x_test": x_test}
+    return feature_cache.save_features(key, features, tokenizer, texts)
+
+
+def load_split_texts():
+    """Raw train/test texts of the cached split, building it on a miss."""
+    key = feature_key()
+    texts = feature_cache.load_texts(key)
+    if texts is None:
+        load_features()
+        texts = feature_cache.load_texts(key)
+    return texts
+
+
+def stage_checkpoint_dir(stage, key):
+    """
+    Epoch backups of a stage, keyed by the stage key so that a changed
+    data, config or code never resumes from stale weights. Backups of
+    other keys are removed.
+    """
+    stage_dir = os.path.join(train_model.CHECKPOINT_DIR, stage)
+    current = key[:16]
+    if os.path.isdir(stage_dir):
+        for name in os.listdir(stage_dir):
+            if name != current:
+                shutil.rmtree(os.path.join(stage_dir, name))
+    return os.path.join(stage_dir, current)
+
+
+def trained_architecture():
+    """Name of the trained model's architecture, as in comparisons."""
+    architecture = train_model.MODEL_ARCHITECTURE
+    if train_model.DISTILL and architecture != "bilstm":
+        architecture += "_distilled"
+    return architecture
+
+
+def train_candidates(model, x_train_pad, y_train, checkpoint_dir=None):
+    """Train the architectures listed in COMPARE_ARCHITECTURES."""
+    architecture = trained_architecture()
+    candidates = {architecture: model}
+    teacher = model if architecture == "bilstm" else None
+    for name in COMPARE_ARCHITECTURES:
+        if name not in candidates:
+            candidates[name] = train_model.train_architecture(
+                x_train_pad, y_train, name, checkpoint_dir=checkpoint_dir
+            )
+        if name == "bilstm":
+            teacher = candidates[name]
+    # Distilled variants reuse a single BiLSTM teacher
+    if train_model.DISTILL:
+        if teacher is None:
+            teacher = train_model.train_architecture(
+                x_train_pad, y_train, "bilstm", checkpoint_dir=checkpoint_dir
+            )
+        for name in COMPARE_ARCHITECTURES:
+            distilled = f"{name}_distilled"
+            if name != "bilstm" and distilled not in candidates:
+                candidates[distilled] = train_model.train_architecture(
+                    x_train_pad, y_train, name, teacher, checkpoint_dir
+                )
+    return candidates
+
+
+def train_stage(key):
+    """Train the configured model and save it with its tokenizer."""
+    features, tokenizer = load_features()
+    model = train_model.train_on_features(
+        features["x_train"], features["y_train"],
+        checkpoint_dir=stage_checkpoint_dir("train", key)
+    )
+    train_model.save_models(
+        model, tokenizer, LOCAL_MODEL_FILE, LOCAL_TOKENIZER_FILE
+    )
+
+
+def train_linear_stage():
+    """Train the cascade's linear model (needs raw texts) and save it."""
+    features, _ = load_features()
+    x_train, _ = load_split_texts()
+    linear_model = train_model.train_linear_model(
+        x_train, features["y_train"]
+    )
+    train_model.save_linear_model(linear_model, LOCAL_LINEAR_FILE)
+
+
+def evaluate_stage(key):
+    """Evaluate the saved models and write the metrics file."""
+    features, _ = load_features()
+    x_train_pad, y_train = features["x_train"], features["y_train"]
+    x_test_pad, y_test = features["x_test"], features["y_test"]
+    model = tf.keras.models.load_model(LOCAL_MODEL_FILE)
+    with open(LOCAL_LINEAR_FILE, "rb") as handle:
+        linear_model = pickle.load(handle)
+    # 1. Evaluate the model
+    results, report_dict = evaluate_model.evaluate(model, x_test_pad, y_test)
+    # 2. Accuracy, size and CPU latency of the trained model, compared
+    # with other architectures on request
+    architecture = trained_architecture()
+    profile = evaluate_model.profile_model(model, x_test_pad, y_test)
+    print(f"Model profile ({architecture}): {profile}")
+    comparison = None
+    if COMPARE_ARCHITECTURES:
+        candidates = train_candidates(
+            model, x_train_pad, y_train,
+            stage_checkpoint_dir("evaluate", key)
+        )
+        comparison = evaluate_model.compare_models(
+            candidates, x_test_pad, y_test, {architecture: profile}
+        )
+    # 3. Compare the cascade with the neural model alone
+    _, x_test = load_split_texts()
+    cascade_metrics = evaluate_model.evaluate_cascade(
+        linear_model, model, x_test, x_test_pad, y_test
+    )
+    print(f"Cascade: {cascade_metrics}")
+    evaluate_model.save_metrics(
+        results, report_dict, comparison, cascade_metrics,
+        {"architecture": architecture, **profile}, LOCAL_METRICS_FILE
+    )
+
+
+def upload_artifacts(artifacts, bucket_name):
+    """Upload local files to their S3 keys."""
+    for local_path, s3_key in artifacts.items():
+        upload_file_to_s3(local_path, bucket_name, s3_key)
 
 
 def run_model_pipeline():
     """Run the full model pipeline."""
+    # Fail before any training on a misspelled architecture
+    for name in [train_model.MODEL_ARCHITECTURE, *COMPARE_ARCHITECTURES]:
+        train_model.check_architecture(name)
+    # Unchanged stages are skipped, interrupted training resumes
+    stages = StageRunner("model")
+    if stages.force:
+        shutil.rmtree(train_model.CHECKPOINT_DIR, ignore_errors=True)
+    ensure_local_data()
+    training_config = {
+        "architecture": train_model.MODEL_ARCHITECTURE,
+        "distill": train_model.DISTILL,
+        "distill_alpha": train_model.DISTILL_ALPHA,
+        "test_size": TEST_SIZE,
+        "random_state": RANDOM_STATE,
+    }
     print("Step 1: Training")
-    # 1. Load data
-    x_train, x_test, y_train, y_test = load_and_split_data()
-    # 2. Train model
-    tokenizer, model = train_model.train(x_train, y_train)
+    # 1. Train model
+    stages.run(
+        "train", train_stage,
+        inputs=[LOCAL_DATA_FILE],
+        outputs=[LOCAL_MODEL_FILE, LOCAL_TOKENIZER_FILE],
+        config=training_config,
+        code=[train_model, feature_cache],
+        pass_key=True
+    )
+    # 2. Train the cascade's linear model
+    stages.run(
+        "train_linear", train_linear_stage,
+        inputs=[LOCAL_DATA_FILE],
+        outputs=[LOCAL_LINEAR_FILE],
+        config=training_config,
+        code=[train_model]
+    )
     # 3. Save artifacts to S3
-    train_model.save_and_upload_models(
-        model, tokenizer, BUCKET_NAME, MODEL_S3_KEY, TOKENIZER_S3_KEY
+    stages.run(
+        "upload_models", upload_artifacts,
+        inputs=[LOCAL_MODEL_FILE, LOCAL_TOKENIZER_FILE, LOCAL_LINEAR_FILE],
+        artifacts={
+            LOCAL_MODEL_FILE: MODEL_S3_KEY,
+            LOCAL_TOKENIZER_FILE: TOKENIZER_S3_KEY,
+            LOCAL_LINEAR_FILE: LINEAR_S3_KEY,
+        },
+        bucket_name=BUCKET_NAME
     )
     print("Training complete and artifacts uploaded.")
     print("Step 2: Evaluation")
-    # 4. Prepare test data for evaluation
-    x_test_pad, y_test = evaluate_model.prepare_test_data(
-        x_test, y_test, tokenizer
+    # 4. Evaluate the models
+    stages.run(
+        "evaluate", evaluate_stage,
+        inputs=[
+            LOCAL_DATA_FILE, LOCAL_MODEL_FILE, LOCAL_TOKENIZER_FILE,
+            LOCAL_LINEAR_FILE
+        ],
+        outputs=[LOCAL_METRICS_FILE],
+        config={
+            **training_config,
+            "compare_architectures": COMPARE_ARCHITECTURES,
+            "cascade_band": [cascade.CASCADE_LOWER, cascade.CASCADE_UPPER],
+        },
+        code=[evaluate_model, train_model, cascade],
+        pass_key=True
     )
-    # 5. Evaluate the model
-    results, report_dict = evaluate_model.evaluate(model, x_test_pad, y_test)
-    # 6. Save metrics
-    evaluate_model.save_and_upload_metrics(
-        results, report_dict, BUCKET_NAME, METRICS_S3_KEY
+    # 5. Save metrics
+    stages.run(
+        "upload_metrics", upload_artifacts,
+        inputs=[LOCAL_METRICS_FILE],
+        artifacts={LOCAL_METRICS_FILE: METRICS_S3_KEY},
+        bucket_name=BUCKET_NAME
     )
     print("Evaluation complete and metrics uploaded.")
+    stages.summary()
 
 
 if __name__ == "__main__":
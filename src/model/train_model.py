@@ -1,16 +1,46 @@
 """
-Build and train a binary classification model using BiLSTMs.
+Build and train a binary classification model.
+
+The default architecture uses BiLSTMs. Cheaper alternatives (pooled
+embeddings, 1D-CNN) can be selected with MODEL_ARCHITECTURE, optionally
+distilled from a BiLSTM teacher with DISTILL=true.
 """
 
+import os
 import pickle
+import numpy as np
 import tensorflow as tf
 from tensorflow import keras
-from src.utils.s3_utils import upload_file_to_s3
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+
+
+# Configuration
+MAX_VOCAB = 10000
+MAX_LEN = 128
+MODEL_ARCHITECTURE = os.getenv("MODEL_ARCHITECTURE", "bilstm")
+DISTILL = os.getenv("DISTILL", "false").lower() == "true"
+# Weight of the true labels in the distillation targets
+DISTILL_ALPHA = float(os.getenv("DISTILL_ALPHA", "0.5"))
+# Per-epoch backups so an interrupted training resumes where it stopped
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "checkpoints")
+
+
+def compile_model(model, metrics=("accuracy", "precision", "recall")):
+    """Compile a model with the shared loss, optimizer and metrics."""
+    model.compile(
+        loss=tf.keras.losses.BinaryCrossentropy(),
+        optimizer=tf.keras.optimizers.Adam(1e-3),
+        metrics=list(metrics)
+    )
+    return model
 
 
 def create_lstm_model(vocab_size):
     """Defines the LSTM architecture."""
     model = tf.keras.Sequential([
+        tf.keras.Input(shape=(MAX_LEN,)),
         tf.keras.layers.Embedding(vocab_size, 32),
         tf.keras.layers.Bidirectional(
             tf.keras.layers.LSTM(64, return_sequences=True)
@@ -20,52 +50,169 @@ def create_lstm_model(vocab_size):
         tf.keras.layers.Dropout(0.5),
         tf.keras.layers.Dense(1, activation="sigmoid")
     ])
-    model.compile(
-        loss=tf.keras.losses.BinaryCrossentropy(),
-        optimizer=tf.keras.optimizers.Adam(1e-3),
-        metrics=["accuracy", "precision", "recall"]
-    )
-    return model
+    return compile_model(model)
+
+
+def create_pooled_model(vocab_size):
+    """Defines a pooled-embedding architecture (bag of embeddings)."""
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(MAX_LEN,)),
+        tf.keras.layers.Embedding(vocab_size, 32, mask_zero=True),
+        tf.keras.layers.GlobalAveragePooling1D(),
+        tf.keras.layers.Dense(32, activation="relu"),
+        tf.keras.layers.Dropout(0.5),
+        tf.keras.layers.Dense(1, activation="sigmoid")
+    ])
+    return compile_model(model)
+
+
+def create_cnn_model(vocab_size):
+    """Defines a 1D-CNN architecture."""
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(MAX_LEN,)),
+        tf.keras.layers.Embedding(vocab_size, 32),
+        tf.keras.layers.Conv1D(64, 5, activation="relu"),
+        tf.keras.layers.GlobalMaxPooling1D(),
+        tf.keras.layers.Dense(32, activation="relu"),
+        tf.keras.layers.Dropout(0.5),
+        tf.keras.layers.Dense(1, activation="sigmoid")
+    ])
+    return compile_model(model)
+
+
+# Architectures selectable with MODEL_ARCHITECTURE
+ARCHITECTURES = {
+    "bilstm": create_lstm_model,
+    "pooled": create_pooled_model,
+    "cnn": create_cnn_model,
+}
+
+
+def check_architecture(architecture):
+    """Raise ValueError if the architecture name is unknown."""
+    if architecture not in ARCHITECTURES:
+        raise ValueError(
+            f"Unknown architecture '{architecture}'. "
+            f"Available: {', '.join(ARCHITECTURES)}"
+        )
+
 
+def build_model(architecture, vocab_size=MAX_VOCAB):
+    """Create a compiled model for the given architecture name."""
+    check_architecture(architecture)
+    return ARCHITECTURES[architecture](vocab_size)
 
-def train(x_train, y_train):
-    """Main function."""
-    # 1. Tokenization
-    max_vocab = 10000
-    tokenizer = keras.preprocessing.text.Tokenizer(num_words=max_vocab)
-    tokenizer.fit_on_texts(x_train)  # Fit only on training data
-    x_train_seq = tokenizer.texts_to_sequences(x_train)
-    x_train_pad = keras.utils.pad_sequences(
-        x_train_seq, padding="post", maxlen=128
+
+def fit_tokenizer(x_train):
+    """Fit the tokenizer on training texts only."""
+    tokenizer = keras.preprocessing.text.Tokenizer(num_words=MAX_VOCAB)
+    tokenizer.fit_on_texts(x_train)
+    return tokenizer
+
+
+def pad_texts(tokenizer, texts):
+    """Convert texts into padded sequences of token ids."""
+    sequences = tokenizer.texts_to_sequences(texts)
+    return keras.utils.pad_sequences(
+        sequences, padding="post", maxlen=MAX_LEN
     )
-    # 2. Model Training
-    print("Starting training...")
-    model = create_lstm_model(max_vocab)
+
+
+def distillation_targets(teacher, x_train_pad, y_train, alpha=DISTILL_ALPHA):
+    """Blend true labels with the teacher's soft predictions."""
+    soft = teacher.predict(x_train_pad, batch_size=256, verbose=0)
+    hard = np.asarray(y_train, dtype="float32").reshape(-1, 1)
+    return alpha * hard + (1 - alpha) * soft
+
+
+def train_architecture(x_train_pad, y_train, architecture, teacher=None,
+                       checkpoint_dir=None):
+    """
+    Build and fit one architecture. Distil from teacher if given.
+
+    The fitted model is kept in checkpoint_dir, so that a rerun after an
+    interruption loads it instead of refitting.
+    """
+    checkpoint_dir = checkpoint_dir or CHECKPOINT_DIR
+    run_name = architecture if teacher is None else f"{architecture}_distilled"
+    completed = os.path.join(checkpoint_dir, f"{run_name}.keras")
+    if os.path.exists(completed):
+        print(f"Loading completed {run_name} from {completed}")
+        return tf.keras.models.load_model(completed)
+    model = build_model(architecture)
+    # Hold out the last 10% and always validate on the true labels
+    n_val = max(1, len(x_train_pad) // 10)
+    y_train = np.asarray(y_train)
+    x_fit, x_val = x_train_pad[:-n_val], x_train_pad[-n_val:]
+    y_fit, y_val = y_train[:-n_val], y_train[-n_val:]
+    targets = y_fit
+    if teacher is not None:
+        print(f"Distilling {architecture} from teacher...")
+        targets = distillation_targets(teacher, x_fit, y_fit)
+        # Accuracy and co. are meaningless against blended targets
+        compile_model(model, metrics=())
     early_stop = tf.keras.callbacks.EarlyStopping(
         monitor="val_loss", patience=2, restore_best_weights=True
     )
+    # Removed by Keras once training completes. The EarlyStopping state
+    # is not backed up: a resumed run restores the best weights among
+    # the epochs trained after resuming only.
+    backup = tf.keras.callbacks.BackupAndRestore(
+        backup_dir=os.path.join(checkpoint_dir, run_name)
+    )
     model.fit(
-        x_train_pad, y_train,
+        x_fit, targets,
         epochs=20,
-        validation_split=0.1,
+        validation_data=(x_val, y_val),
         batch_size=32,
-        callbacks=[early_stop]
+        callbacks=[early_stop, backup]
+    )
+    if teacher is not None:
+        compile_model(model)  # Restore the metrics used for evaluation
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    tmp_path = os.path.join(checkpoint_dir, f"{run_name}.tmp.keras")
+    model.save(tmp_path)
+    os.replace(tmp_path, completed)
+    return model
+
+
+def train_on_features(x_train_pad, y_train, architecture=MODEL_ARCHITECTURE,
+                      distill=DISTILL, checkpoint_dir=None):
+    """Train the configured model on already padded sequences."""
+    print(f"Starting training ({architecture})...")
+    teacher = None
+    if distill and architecture != "bilstm":
+        print("Training BiLSTM teacher...")
+        teacher = train_architecture(
+            x_train_pad, y_train, "bilstm", checkpoint_dir=checkpoint_dir
+        )
+    return train_architecture(
+        x_train_pad, y_train, architecture, teacher, checkpoint_dir
     )
-    return tokenizer, model
 
 
-def save_and_upload_models(model, tokenizer, bucket_name, model_s3_key,
-                           tokenizer_s3_key):
-    """Save and upload model into S3."""
-    # 3. Save Artifacts and Upload to S3
-    print("Saving artifacts...")
-    # Save & Upload Model
-    local_model_path = "model_temp.keras"
+def train_linear_model(x_train, y_train):
+    """Train a hashed n-gram logistic regression (cascade first stage)."""
+    print("Training linear model...")
+    linear_model = make_pipeline(
+        HashingVectorizer(
+            ngram_range=(1, 2), n_features=2**20, alternate_sign=False
+        ),
+        LogisticRegression(max_iter=1000, solver="liblinear")
+    )
+    linear_model.fit(x_train, y_train)
+    return linear_model
+
+
+def save_models(model, tokenizer, local_model_path="model_temp.keras",
+                local_tok_path="tokenizer_temp.pickle"):
+    """Save model and tokenizer locally."""
     model.save(local_model_path)
-    upload_file_to_s3(local_model_path, bucket_name, model_s3_key)
-    # Save & Upload Tokenizer
-    local_tok_path = "tokenizer_temp.pickle"
     with open(local_tok_path, "wb") as handle:
         pickle.dump(tokenizer, handle, protocol=pickle.HIGHEST_PROTOCOL)
-    upload_file_to_s3(local_tok_path, bucket_name, tokenizer_s3_key)
-    print("Training finished and artifacts uploaded to S3.")
+
+
+def save_linear_model(linear_model, local_linear_path="linear_temp.pickle"):
+    """Save the linear model locally."""
+    with open(local_linear_path, "wb") as handle:
+        pickle.dump(linear_model, handle, protocol=pickle.HIGHEST_PROTOCOL)
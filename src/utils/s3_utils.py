@@ -33,3 +33,14 @@ def upload_file_to_s3(local_path, bucket_name, s3_key):
     except (BotoCoreError, ClientError) as e:
         print(f"Error during upload: {e}")
         raise
+
+
+def get_s3_etag(bucket_name, s3_key):
+    """Returns the ETag of an S3 object (changes with its content)."""
+    s3 = get_s3_client()
+    try:
+        response = s3.head_object(Bucket=bucket_name, Key=s3_key)
+        return response["ETag"].strip('"')
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error reading metadata of s3://{bucket_name}/{s3_key}: {e}")
+        raise
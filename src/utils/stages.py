@@ -0,0 +1,108 @@
+"""
+Memoized pipeline stages.
+
+Each stage is keyed by a hash of its input files, its configuration and
+the source code of the modules it runs. When the key matches the last
+successful run and the outputs still exist, the stage is skipped.
+"""
+
+import os
+import json
+import time
+import inspect
+import hashlib
+
+
+# Configuration
+STAGE_CACHE_DIR = os.getenv("STAGE_CACHE_DIR", ".stage_cache")
+# Set FORCE_RERUN=true to ignore memoized stages
+FORCE_RERUN = os.getenv("FORCE_RERUN", "false").lower() == "true"
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_hash(obj):
+    """SHA-256 of the source code of a module or function."""
+    return hashlib.sha256(inspect.getsource(obj).encode()).hexdigest()
+
+
+def stage_key(fn, inputs, config, code):
+    """Hash of input files, configuration and source code."""
+    modules = {inspect.getmodule(fn), *code}
+    payload = {
+        "inputs": {path: file_hash(path) for path in inputs},
+        "config": config,
+        "code": sorted(source_hash(m) for m in modules),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class StageRunner:
+    """Run the stages of one pipeline and report what was reused."""
+
+    def __init__(self, pipeline_name, cache_dir=STAGE_CACHE_DIR,
+                 force=FORCE_RERUN):
+        self.cache_dir = os.path.join(cache_dir, pipeline_name)
+        self.force = force
+        self.records = []
+
+    def _manifest_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def _load_manifest(self, name):
+        path = self._manifest_path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_manifest(self, name, manifest):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self._manifest_path(name)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(tmp_path, self._manifest_path(name))
+
+    def run(self, name, fn, inputs=(), outputs=(), config=None, code=(),
+            pass_key=False, **kwargs):
+        """
+        Run fn(**kwargs) unless a previous run had the same key and its
+        outputs still exist. config defaults to kwargs. With pass_key,
+        the stage key is also given to fn as `key`.
+        """
+        start = time.perf_counter()
+        config = kwargs if config is None else config
+        key = stage_key(fn, inputs, config, code)
+        manifest = self._load_manifest(name)
+        if (not self.force and manifest and manifest["key"] == key
+                and all(os.path.exists(path) for path in outputs)):
+            overhead = time.perf_counter() - start
+            saved = max(0.0, manifest["seconds"] - overhead)
+            print(f"Stage '{name}' unchanged, reusing previous outputs.")
+            self.records.append((name, "reused", overhead, saved))
+            return
+        if pass_key:
+            kwargs["key"] = key
+        fn(**kwargs)
+        seconds = time.perf_counter() - start
+        self._save_manifest(name, {
+            "key": key, "seconds": seconds, "outputs": list(outputs)
+        })
+        self.records.append((name, "ran", seconds, 0.0))
+
+    def summary(self):
+        """Print which stages ran or were reused and the time saved."""
+        print(f"{'stage':<20}{'status':>10}{'seconds':>10}{'saved':>10}")
+        for name, status, seconds, saved in self.records:
+            print(f"{name:<20}{status:>10}{seconds:>10.1f}{saved:>10.1f}")
+        total = sum(record[3] for record in self.records)
+        print(f"Total time saved: {total:.1f}s")
+        return total
@@ -14,7 +14,8 @@ resource "aws_apprunner_service" "api_service" {
       image_configuration {
         port = "8000"
         runtime_environment_variables = {
-          BUCKET_NAME = data.aws_s3_bucket.data_bucket.bucket
+          BUCKET_NAME     = data.aws_s3_bucket.data_bucket.bucket
+          WEB_CONCURRENCY = var.api_workers
         }
       }
     }
@@ -7,3 +7,9 @@ variable "group_name" {
   description = "Group identifier"
   type        = string
 }
+
+variable "api_workers" {
+  description = "Number of uvicorn worker processes for the API"
+  type        = number
+  default     = 1
+}
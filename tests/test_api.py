@@ -1,8 +1,14 @@
 """Test API"""
 
-from unittest.mock import MagicMock, patch
+import os
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi.testclient import TestClient
 from src.api.main import app
+from src.api.executor import BoundedExecutor, QueueFullError
+from src.api.model_loader import fetch_artifact
+from src.api import profiling
 import src.api.main
 
 
@@ -48,6 +54,8 @@ def test_predict_positive_sentiment(mock_clean):
     # 1. Mock Configuration
     mock_clean.return_value = "cleaned text"  # Preprocessing result
     mock_loader = MagicMock()
+    mock_loader.lemma_table = None  # Full preprocessing path
+    mock_loader.linear_model = None  # Cascade disabled
     # Simulate the tokenizer
     mock_loader.tokenizer.texts_to_sequences.return_value = [[1, 2, 3]]
     # Simulate the model prediction (Score > 0.5 = POSITIVE)
@@ -71,6 +79,8 @@ def test_predict_negative_sentiment(mock_clean):
     """Test the /predict endpoint with a negative result."""
     mock_clean.return_value = "cleaned text"
     mock_loader = MagicMock()
+    mock_loader.lemma_table = None
+    mock_loader.linear_model = None
     mock_loader.tokenizer.texts_to_sequences.return_value = [[1, 2, 3]]
     # Score < 0.5 = NEGATIVE
     mock_loader.model.predict.return_value = [[0.15]]
@@ -83,6 +93,83 @@ def test_predict_negative_sentiment(mock_clean):
     assert data["confidence"] == 0.15
 
 
+@patch("src.api.main.clean_text")
+def test_predict_cascade_confident_linear(mock_clean):
+    """A confident linear score is returned without calling the model."""
+    mock_clean.return_value = "cleaned text"
+    mock_loader = MagicMock()
+    mock_loader.lemma_table = None
+    mock_loader.linear_model.predict_proba.return_value = [[0.05, 0.95]]
+    src.api.main.loader = mock_loader
+    response = client.post("/predict", json={"content": "Great!"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["label"] == "POSITIVE"
+    assert data["model"] == "linear"
+    mock_loader.model.predict.assert_not_called()
+
+
+@patch("src.api.main.clean_text")
+def test_predict_cascade_escalates(mock_clean):
+    """An uncertain linear score is escalated to the neural model."""
+    mock_clean.return_value = "cleaned text"
+    mock_loader = MagicMock()
+    mock_loader.lemma_table = None
+    mock_loader.linear_model.predict_proba.return_value = [[0.45, 0.55]]
+    mock_loader.tokenizer.texts_to_sequences.return_value = [[1, 2, 3]]
+    mock_loader.model.predict.return_value = [[0.15]]
+    src.api.main.loader = mock_loader
+    response = client.post("/predict", json={"content": "Not sure."})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["label"] == "NEGATIVE"
+    assert data["model"] == "neural"
+    mock_loader.model.predict.assert_called_once()
+
+
+def test_predict_queue_full():
+    """/predict sheds load with 429 when the inference queue is full."""
+    src.api.main.loader = MagicMock()
+    with patch.object(
+        src.api.main.executor, "run",
+        AsyncMock(side_effect=QueueFullError())
+    ):
+        response = client.post("/predict", json={"content": "Hello"})
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+
+
+def test_predict_deadline_exceeded():
+    """/predict returns 503 when inference misses its deadline."""
+    src.api.main.loader = MagicMock()
+    with patch.object(
+        src.api.main.executor, "run",
+        AsyncMock(side_effect=asyncio.TimeoutError())
+    ):
+        response = client.post("/predict", json={"content": "Hello"})
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+
+
+def test_bounded_executor_rejects_when_full():
+    """The executor rejects work beyond workers + queue size."""
+    async def scenario():
+        executor = BoundedExecutor(max_workers=1, queue_size=0)
+        release = threading.Event()
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.01)
+        try:
+            await executor.run(lambda: None)
+            rejected = False
+        except QueueFullError:
+            rejected = True
+        release.set()
+        await running
+        executor.shutdown()
+        return rejected
+    assert asyncio.run(scenario())
+
+
 def test_metrics_endpoint():
     """Test /metrics endpoint."""
     mock_loader = MagicMock()
@@ -103,3 +190,88 @@ def test_train_endpoint():
             "message": "Training pipeline triggered in background"
         }
         mock_add_task.assert_called_once()
+
+
+def fake_download(bucket_name, s3_key, local_path):
+    """Write a placeholder artifact instead of downloading it."""
+    with open(local_path, "w") as f:
+        f.write("artifact")
+
+
+@patch("src.api.model_loader.get_s3_etag", return_value="v1")
+@patch("src.api.model_loader.download_file_from_s3")
+def test_fetch_artifact_downloads_once(mock_download, mock_etag, tmp_path):
+    """Workers share the artifact directory: download happens once."""
+    mock_download.side_effect = fake_download
+    first = fetch_artifact("models/tokenizer.pickle", str(tmp_path))
+    second = fetch_artifact("models/tokenizer.pickle", str(tmp_path))
+    assert first == second == str(tmp_path / "v1-tokenizer.pickle")
+    mock_download.assert_called_once()
+
+
+@patch("src.api.model_loader.get_s3_etag")
+@patch("src.api.model_loader.download_file_from_s3")
+def test_fetch_artifact_new_version(mock_download, mock_etag, tmp_path):
+    """A new version in S3 is downloaded and replaces the old one."""
+    mock_download.side_effect = fake_download
+    mock_etag.return_value = "v1"
+    first = fetch_artifact("models/tokenizer.pickle", str(tmp_path))
+    mock_etag.return_value = "v2"
+    second = fetch_artifact("models/tokenizer.pickle", str(tmp_path))
+    assert second == str(tmp_path / "v2-tokenizer.pickle")
+    assert mock_download.call_count == 2
+    assert not os.path.exists(first)
+
+
+def test_profiles_endpoints(tmp_path):
+    """Profiles are written, listed and fetched as text."""
+    with patch("src.api.profiling.PROFILE_DIR", str(tmp_path)):
+        profiling.profiled(sum, [1, 2, 3])
+        profiles = client.get("/profiles").json()["profiles"]
+        assert len(profiles) == 1
+        name = profiles[0]["name"]
+        response = client.get(f"/profiles/{name}?format=text")
+        assert response.status_code == 200
+        assert "cumulative" in response.text
+        assert client.get("/profiles/unknown.prof").status_code == 404
+
+
+def test_profiled_runs_unprofiled_when_busy(tmp_path):
+    """A concurrent request runs without profiling instead of failing."""
+    with profiling._profile_lock:
+        result = profiling.profiled(sum, [1, 2, 3], profile_dir=str(tmp_path))
+    assert result == 6
+    assert profiling.list_profiles(str(tmp_path)) == []
+
+
+def test_should_profile_header_values():
+    """Only X-Profile values 1 and true request a profile."""
+    with (
+        patch("src.api.profiling.PROFILE_ALLOW_HEADER", True),
+        patch("src.api.profiling.PROFILE_SAMPLE_RATE", 0),
+    ):
+        assert profiling.should_profile("1")
+        assert profiling.should_profile("True")
+        assert not profiling.should_profile("0")
+        assert not profiling.should_profile("false")
+        assert not profiling.should_profile(None)
+
+
+def test_rotate_skips_profiles_removed_elsewhere(tmp_path):
+    """Another worker rotating the same directory is not an error."""
+    (tmp_path / "old.prof").write_bytes(b"")
+    with patch("src.api.profiling.os.remove",
+               side_effect=FileNotFoundError):
+        profiling.rotate(str(tmp_path), max_files=0)
+
+
+def test_profiled_survives_save_errors(tmp_path):
+    """Errors while saving or rotating never replace the result."""
+    with patch("src.api.profiling.rotate", side_effect=FileNotFoundError):
+        assert profiling.profiled(
+            sum, [1, 2, 3], profile_dir=str(tmp_path)
+        ) == 6
+    with patch("cProfile.Profile.dump_stats", side_effect=OSError):
+        assert profiling.profiled(
+            sum, [1, 2, 3], profile_dir=str(tmp_path)
+        ) == 6
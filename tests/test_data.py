@@ -2,7 +2,18 @@
 Test data cleaning function.
 """
 
-from src.data.clean_transform import clean_text
+import json
+from collections import Counter, defaultdict
+from unittest.mock import patch
+import nltk
+import pandas as pd
+from src.data.clean_transform import (
+    build_lemma_table,
+    clean_text,
+    fast_clean_text,
+    measure_divergence,
+    process_data,
+)
 
 
 def test_clean_text_stopwords_and_not():
@@ -67,3 +78,58 @@ def test_clean_text_mixed_case_and_punctuation():
     raw_text = "Well... THIS, is a—strange!!! sentence???"
     expected = "well strange sentence"
     assert clean_text(raw_text) == expected
+
+
+def test_lemma_table_most_frequent_lemma():
+    """The lemma table keeps the most frequent lemma of each token."""
+    lemma_counts = defaultdict(Counter)
+    clean_text("Dogs are running faster", lemma_counts=lemma_counts)
+    clean_text("The dogs bark", lemma_counts=lemma_counts)
+    lemma_table = build_lemma_table(lemma_counts)
+    assert lemma_table["dogs"] == "dog"
+    assert lemma_table["running"] == "run"
+
+
+def test_fast_clean_text_matches_clean_text():
+    """Fast cleaning matches the full path on known tokens."""
+    texts = ["Dogs are running faster", "This is NOT a Test!"]
+    lemma_counts = defaultdict(Counter)
+    for text in texts:
+        clean_text(text, lemma_counts=lemma_counts)
+    lemma_table = build_lemma_table(lemma_counts)
+    for text in texts:
+        assert fast_clean_text(text, lemma_table) == clean_text(text)
+    assert measure_divergence(texts, lemma_table)["divergence_rate"] == 0.0
+
+
+def test_fast_clean_text_unknown_tokens():
+    """Unknown tokens fall back to the POS-aware lemmatizer."""
+    assert fast_clean_text("Cats!", {}) == "cat"
+
+
+def test_fast_clean_text_tags_unknown_tokens_once():
+    """All unknown tokens of a text share a single POS tagging call."""
+    with patch("nltk.pos_tag", wraps=nltk.pos_tag) as pos_tag:
+        cleaned = fast_clean_text("Cats chase the mice", {"the": "the"})
+    assert cleaned == "cat chase mouse"
+    pos_tag.assert_called_once()
+
+
+@patch("src.data.clean_transform.download_file_from_s3")
+def test_process_data_lemma_stats_on_held_out(mock_download, tmp_path):
+    """Divergence is measured on reviews left out of the lemma table."""
+    raw_path = str(tmp_path / "raw.parquet")
+    stats_path = str(tmp_path / "stats.json")
+    pd.DataFrame({
+        "label": [1, 0] * 10,
+        "title": [f"Title {i}" for i in range(20)],
+        "content": ["Dogs are running"] * 20,
+    }).to_parquet(raw_path)
+    process_data(
+        "bucket", "key", raw_path, str(tmp_path / "clean.parquet"),
+        str(tmp_path / "lemmas.json"), stats_path
+    )
+    with open(stats_path, encoding="utf-8") as f:
+        stats = json.load(f)
+    assert stats["texts"] == 2
+    assert stats["tokens"] > 0
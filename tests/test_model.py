@@ -0,0 +1,210 @@
+"""
+Test model training utilities.
+"""
+
+import os
+from unittest.mock import MagicMock, patch
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from src.model import batch_score, evaluate_model, feature_cache, train_model
+
+
+@pytest.mark.parametrize("architecture", ["bilstm", "pooled", "cnn"])
+def test_train_architecture_fit_smoke(architecture, tmp_path):
+    """Each architecture trains end to end with epoch backups enabled."""
+    rng = np.random.default_rng(42)
+    x_train_pad = rng.integers(
+        1, train_model.MAX_VOCAB, size=(20, train_model.MAX_LEN)
+    )
+    y_train = np.array([0, 1] * 10)
+    with patch.object(train_model, "CHECKPOINT_DIR", str(tmp_path)):
+        model = train_model.train_architecture(
+            x_train_pad, y_train, architecture
+        )
+    prediction = model.predict(x_train_pad[:2], verbose=0)
+    assert prediction.shape == (2, 1)
+
+
+def test_train_architecture_reuses_completed_model(tmp_path):
+    """A rerun loads the saved model instead of fitting it again."""
+    rng = np.random.default_rng(42)
+    x_train_pad = rng.integers(
+        1, train_model.MAX_VOCAB, size=(20, train_model.MAX_LEN)
+    )
+    y_train = np.array([0, 1] * 10)
+    model = train_model.train_architecture(
+        x_train_pad, y_train, "pooled", checkpoint_dir=str(tmp_path)
+    )
+    assert (tmp_path / "pooled.keras").exists()
+    with patch.object(train_model, "build_model") as build:
+        reloaded = train_model.train_architecture(
+            x_train_pad, y_train, "pooled", checkpoint_dir=str(tmp_path)
+        )
+    build.assert_not_called()
+    np.testing.assert_allclose(
+        reloaded.predict(x_train_pad, verbose=0),
+        model.predict(x_train_pad, verbose=0),
+        rtol=1e-5
+    )
+
+
+def test_train_architecture_distilled(tmp_path):
+    """Distilled students are evaluated with the usual metrics."""
+    rng = np.random.default_rng(42)
+    x_train_pad = rng.integers(
+        1, train_model.MAX_VOCAB, size=(20, train_model.MAX_LEN)
+    )
+    y_train = np.array([0, 1] * 10)
+    teacher = MagicMock()
+    teacher.predict.return_value = np.full((18, 1), 0.5, dtype="float32")
+    with patch.object(train_model, "CHECKPOINT_DIR", str(tmp_path)):
+        model = train_model.train_architecture(
+            x_train_pad, y_train, "pooled", teacher
+        )
+    results = model.evaluate(x_train_pad, y_train, verbose=0)
+    assert len(results) == 4  # loss, accuracy, precision, recall
+
+
+def test_build_model_unknown_architecture():
+    """Unknown architecture names are rejected with the available ones."""
+    with pytest.raises(ValueError, match="bilstm"):
+        train_model.build_model("transformer")
+
+
+def test_distillation_targets():
+    """Targets blend true labels and teacher predictions by alpha."""
+    teacher = MagicMock()
+    teacher.predict.return_value = np.array(
+        [[0.2], [0.6], [0.9]], dtype="float32"
+    )
+    targets = train_model.distillation_targets(
+        teacher, np.zeros((3, 4)), np.array([0, 1, 1]), alpha=0.25
+    )
+    assert targets.shape == (3, 1)
+    np.testing.assert_allclose(targets, [[0.15], [0.7], [0.925]])
+
+
+def test_compare_models_reuses_profiles():
+    """A model profiled beforehand is not measured a second time."""
+    known = {"accuracy": 0.9, "parameters": 10, "size_mb": 0.1,
+             "single_p50_ms": 1.0, "single_p95_ms": 2.0,
+             "batch_rows_per_sec": 100.0}
+    other = dict(known, accuracy=0.8)
+    with patch.object(evaluate_model, "profile_model",
+                      return_value=other) as profile_model:
+        comparison = evaluate_model.compare_models(
+            {"pooled": MagicMock(), "cnn": MagicMock()},
+            np.zeros((2, 4)), np.array([0, 1]), {"pooled": known}
+        )
+    assert comparison == {"pooled": known, "cnn": other}
+    assert profile_model.call_count == 1
+
+
+def test_feature_cache_round_trip(tmp_path):
+    """Saved features reload memory-mapped with the split's raw texts."""
+    data_path = tmp_path / "data.parquet"
+    data_path.write_bytes(b"data")
+    key = feature_cache.cache_key(str(data_path), {"max_len": 128})
+    assert key != feature_cache.cache_key(str(data_path), {"max_len": 64})
+    cache_dir = str(tmp_path / "cache")
+    assert feature_cache.load_features(key, cache_dir) is None
+    features = {
+        name: np.arange(6, dtype="int32").reshape(3, 2)
+        for name in feature_cache.ARRAY_NAMES
+    }
+    texts = {"x_train": ["a b", "c"], "x_test": ["d"]}
+    loaded, tokenizer = feature_cache.save_features(
+        key, features, {"vocab": 1}, texts, cache_dir
+    )
+    assert tokenizer == {"vocab": 1}
+    for name in feature_cache.ARRAY_NAMES:
+        assert isinstance(loaded[name], np.memmap)
+        np.testing.assert_array_equal(loaded[name], features[name])
+    x_train, x_test = feature_cache.load_texts(key, cache_dir)
+    assert list(x_train) == ["a b", "c"]
+    assert list(x_test) == ["d"]
+    # Storing a new key drops the previous entry
+    feature_cache.save_features(
+        "newkey", features, {"vocab": 1}, texts, cache_dir
+    )
+    assert feature_cache.load_features(key, cache_dir) is None
+    assert os.listdir(cache_dir) == ["newkey"]
+
+
+def test_split_s3_uri():
+    """s3:// URIs are split into bucket and key, local paths are not."""
+    assert batch_score.split_s3_uri("s3://bucket/data/x.parquet") == (
+        "bucket", "data/x.parquet"
+    )
+    assert batch_score.split_s3_uri("data/x.parquet") is None
+
+
+def mock_loader():
+    """Loader whose model scores every text 0.9."""
+    loader = MagicMock()
+    loader.lemma_table = {"great": "great", "bad": "bad", "product": "product"}
+    loader.tokenizer.texts_to_sequences.side_effect = (
+        lambda texts: [[1, 2]] * len(texts)
+    )
+    loader.model.predict.side_effect = (
+        lambda padded, **kwargs: np.full((len(padded), 1), 0.9)
+    )
+    loader.linear_model = None
+    return loader
+
+
+def test_score_chunk_cascade():
+    """Only rows the linear model is unsure about reach the neural model."""
+    loader = mock_loader()
+    loader.linear_model = MagicMock()
+    loader.linear_model.predict_proba.return_value = np.array(
+        [[0.95, 0.05], [0.5, 0.5], [0.1, 0.9]]
+    )
+    labels, scores, models = batch_score.score_chunk(
+        loader, ["bad", "product", "great"]
+    )
+    assert list(labels) == ["NEGATIVE", "POSITIVE", "POSITIVE"]
+    assert scores.tolist() == pytest.approx([0.05, 0.9, 0.9])
+    assert list(models) == ["linear", "neural", "linear"]
+    loader.tokenizer.texts_to_sequences.assert_called_once_with(["product"])
+
+
+@patch("src.model.batch_score.ModelLoader")
+def test_score_file_null_chunk(mock_loader_cls, tmp_path):
+    """A chunk whose title column is entirely null is still written."""
+    mock_loader_cls.return_value = mock_loader()
+    input_path = str(tmp_path / "input.parquet")
+    output_path = str(tmp_path / "output.parquet")
+    pq.write_table(pa.table({
+        "label": [1, 0, 1],
+        "title": ["great", "bad", None],
+        "content": ["product", "product", "product"],
+    }), input_path)
+    report = batch_score.score_file(
+        input_path, output_path, chunk_size=2, workers=1
+    )
+    scored = pq.read_table(output_path).to_pandas()
+    assert report["rows"] == 3
+    assert list(scored["predicted_label"]) == ["POSITIVE"] * 3
+    assert scored["confidence"].tolist() == pytest.approx([0.9] * 3)
+    assert list(scored["label"]) == [1, 0, 1]
+    assert list(scored["model"]) == ["neural"] * 3
+
+
+@patch("src.model.batch_score.ModelLoader")
+def test_score_file_empty_input(mock_loader_cls, tmp_path):
+    """An empty input still produces an (empty) output file."""
+    mock_loader_cls.return_value = mock_loader()
+    input_path = str(tmp_path / "input.parquet")
+    output_path = str(tmp_path / "output.parquet")
+    pq.write_table(pa.table({
+        "label": pa.array([], pa.int64()),
+        "content": pa.array([], pa.string()),
+    }), input_path)
+    report = batch_score.score_file(input_path, output_path, workers=1)
+    scored = pq.read_table(output_path)
+    assert report["rows"] == 0
+    assert scored.num_rows == 0
+    assert "predicted_label" in scored.column_names
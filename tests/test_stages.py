@@ -0,0 +1,76 @@
+"""
+Test memoized pipeline stages.
+"""
+
+from src.utils.stages import StageRunner
+
+
+def write_output(path, text):
+    """Stage function: write text to path."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def record_key(store, key):
+    """Stage function: keep the stage key."""
+    store["key"] = key
+
+
+def run_stage(tmp_path, text="a", force=False):
+    """Run one stage reading input.txt and writing output.txt."""
+    runner = StageRunner("test", cache_dir=str(tmp_path / "cache"),
+                         force=force)
+    runner.run(
+        "write", write_output,
+        inputs=[str(tmp_path / "input.txt")],
+        outputs=[str(tmp_path / "output.txt")],
+        path=str(tmp_path / "output.txt"), text=text
+    )
+    return runner.records[0][1]
+
+
+def test_stage_skipped_on_same_key(tmp_path):
+    """A stage with unchanged inputs, config and outputs is reused."""
+    (tmp_path / "input.txt").write_text("data")
+    assert run_stage(tmp_path) == "ran"
+    assert run_stage(tmp_path) == "reused"
+
+
+def test_stage_rerun_on_changed_input(tmp_path):
+    """Changing an input file reruns the stage."""
+    (tmp_path / "input.txt").write_text("data")
+    run_stage(tmp_path)
+    (tmp_path / "input.txt").write_text("new data")
+    assert run_stage(tmp_path) == "ran"
+
+
+def test_stage_rerun_on_changed_config(tmp_path):
+    """Changing the configuration reruns the stage."""
+    (tmp_path / "input.txt").write_text("data")
+    run_stage(tmp_path, text="a")
+    assert run_stage(tmp_path, text="b") == "ran"
+    assert (tmp_path / "output.txt").read_text() == "b"
+
+
+def test_stage_rerun_on_missing_output(tmp_path):
+    """A stage whose output was deleted is run again."""
+    (tmp_path / "input.txt").write_text("data")
+    run_stage(tmp_path)
+    (tmp_path / "output.txt").unlink()
+    assert run_stage(tmp_path) == "ran"
+    assert (tmp_path / "output.txt").exists()
+
+
+def test_stage_force(tmp_path):
+    """force reruns a stage even if nothing changed."""
+    (tmp_path / "input.txt").write_text("data")
+    run_stage(tmp_path)
+    assert run_stage(tmp_path, force=True) == "ran"
+
+
+def test_stage_pass_key(tmp_path):
+    """With pass_key, the stage receives its key."""
+    received = {}
+    runner = StageRunner("test", cache_dir=str(tmp_path))
+    runner.run("keyed", record_key, pass_key=True, store=received)
+    assert len(received["key"]) == 64